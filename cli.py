@@ -6,54 +6,108 @@ This file makes it easy to use the test case generator from your terminal.
 You can run commands like: python cli.py generate "your user story"
 """
 
+import asyncio
 import click
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import itertools
 import os
-from dotenv import load_dotenv
-from test_case_generator import AITestCaseGenerator
-from colorama import Fore, Style, init
+import sys
+import types
 import json
 
-# Initialize colorama for colored terminal output
-init(autoreset=True)
+# Heavier imports (openai via test_case_generator, colorama, dotenv) happen
+# inside the functions that need them, so "--help", "examples" and "setup"
+# start quickly.
+
+
+@functools.lru_cache(maxsize=None)
+def _env():
+    """
+    Load environment variables from the .env file, only once.
+
+    Returns a read-only snapshot so every command sees the same settings.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return types.MappingProxyType(dict(os.environ))
+
+
+@functools.lru_cache(maxsize=None)
+def _colors():
+    """
+    Set up colorama the first time something is printed.
+
+    Returns the color codes used by the print helpers, looked up once.
+    When output goes to a file or another program (e.g. CI logs) instead
+    of a terminal, every code is empty so no escape codes end up there.
+    """
+    if not sys.stdout.isatty():
+        return types.SimpleNamespace(
+            GREEN="", RED="", CYAN="", YELLOW="", RESET="", RULE="=" * 80
+        )
+
+    from colorama import Fore, Style, init
+
+    # Initialize colorama for colored terminal output
+    init(autoreset=True)
+
+    return types.SimpleNamespace(
+        GREEN=Fore.GREEN,
+        RED=Fore.RED,
+        CYAN=Fore.CYAN,
+        YELLOW=Fore.YELLOW,
+        RESET=Style.RESET_ALL,
+        RULE=f"{Fore.YELLOW}{'=' * 80}{Style.RESET_ALL}",
+    )
 
 
 def print_success(message):
     """Print a success message in green"""
-    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+    c = _colors()
+    print(f"{c.GREEN}✓ {message}{c.RESET}")
 
 
 def print_error(message):
     """Print an error message in red"""
-    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+    c = _colors()
+    print(f"{c.RED}✗ {message}{c.RESET}")
 
 
 def print_info(message):
     """Print an info message in blue"""
-    print(f"{Fore.CYAN}ℹ {message}{Style.RESET_ALL}")
+    c = _colors()
+    print(f"{c.CYAN}ℹ {message}{c.RESET}")
 
 
 def print_test_case(tc, index):
     """Pretty print a single test case to the terminal"""
-    print(f"\n{Fore.YELLOW}{'=' * 80}{Style.RESET_ALL}")
-    print(f"{Fore.YELLOW}Test Case {index}: {tc.title}{Style.RESET_ALL}")
-    print(f"{Fore.YELLOW}{'=' * 80}{Style.RESET_ALL}")
-
-    print(f"\n{Fore.CYAN}Type:{Style.RESET_ALL} {tc.test_type}")
-    print(f"{Fore.CYAN}Priority:{Style.RESET_ALL} {tc.priority}")
-    print(f"\n{Fore.CYAN}Description:{Style.RESET_ALL}")
-    print(f"  {tc.description}")
+    c = _colors()
+
+    # Collect every line first so the whole test case is written at once
+    lines = [
+        f"\n{c.RULE}",
+        f"{c.YELLOW}Test Case {index}: {tc.title}{c.RESET}",
+        c.RULE,
+        f"\n{c.CYAN}Type:{c.RESET} {tc.test_type}",
+        f"{c.CYAN}Priority:{c.RESET} {tc.priority}",
+        f"\n{c.CYAN}Description:{c.RESET}",
+        f"  {tc.description}",
+    ]
 
     if tc.preconditions:
-        print(f"\n{Fore.CYAN}Preconditions:{Style.RESET_ALL}")
-        for precond in tc.preconditions:
-            print(f"  • {precond}")
+        lines.append(f"\n{c.CYAN}Preconditions:{c.RESET}")
+        lines.extend(f"  • {precond}" for precond in tc.preconditions)
+
+    lines.append(f"\n{c.CYAN}Steps:{c.RESET}")
+    lines.extend(f"  {i}. {step}" for i, step in enumerate(tc.steps, 1))
 
-    print(f"\n{Fore.CYAN}Steps:{Style.RESET_ALL}")
-    for i, step in enumerate(tc.steps, 1):
-        print(f"  {i}. {step}")
+    lines.append(f"\n{c.CYAN}Expected Result:{c.RESET}")
+    lines.append(f"  {tc.expected_result}")
 
-    print(f"\n{Fore.CYAN}Expected Result:{Style.RESET_ALL}")
-    print(f"  {tc.expected_result}")
+    click.echo("\n".join(lines))
 
 
 @click.group()
@@ -64,8 +118,6 @@ def cli():
     Generate comprehensive test cases from user stories using AI.
     Perfect for QA engineers, developers, and product managers!
     """
-    # Load environment variables from .env file
-    load_dotenv()
 
 
 @cli.command()
@@ -74,7 +126,9 @@ def cli():
 @click.option('--model', '-m', default='gpt-3.5-turbo', help='OpenAI model to use')
 @click.option('--output', '-o', help='Save to file (e.g., test_cases.json or test_cases.md)')
 @click.option('--focus', '-f', multiple=True, help='Focus areas (e.g., -f security -f performance)')
-def generate(user_story, count, model, output, focus):
+@click.option('--no-cache', is_flag=True, help='Always call OpenAI, never read or save cached answers')
+@click.option('--refresh-cache', is_flag=True, help='Ignore cached answers and save fresh ones')
+def generate(user_story, count, model, output, focus, no_cache, refresh_cache):
     """
     Generate test cases from a user story.
 
@@ -87,7 +141,7 @@ def generate(user_story, count, model, output, focus):
     print_info(f"Generating {count} test cases...")
 
     # Get API key from environment
-    api_key = os.getenv('OPENAI_API_KEY')
+    api_key = _env().get('OPENAI_API_KEY')
     if not api_key:
         print_error("OPENAI_API_KEY not found!")
         print_info("Please create a .env file with your API key:")
@@ -96,44 +150,258 @@ def generate(user_story, count, model, output, focus):
         return
 
     try:
+        from test_case_generator import AITestCaseGenerator, DEFAULT_CACHE_DIR
+
         # Create generator
-        generator = AITestCaseGenerator(api_key, model=model)
-
-        # Generate test cases
-        focus_list = list(focus) if focus else None
-        test_cases = generator.generate_test_cases(
-            user_story=user_story,
-            num_cases=count,
-            focus_areas=focus_list
-        )
+        with AITestCaseGenerator(
+            api_key,
+            model=model,
+            cache_dir=None if no_cache else DEFAULT_CACHE_DIR,
+            refresh_cache=refresh_cache
+        ) as generator:
+            # Generate test cases, showing each one as soon as it arrives
+            focus_list = list(focus) if focus else None
+            test_cases = []
+            for tc in generator.stream_test_cases(
+                user_story=user_story,
+                num_cases=count,
+                focus_areas=focus_list
+            ):
+                test_cases.append(tc)
+                print_test_case(tc, len(test_cases))
+
+            print_success(f"\nGenerated {len(test_cases)} test cases!")
+
+            # Save to file if requested
+            if output:
+                if output.endswith('.json'):
+                    generator.export_to_json(test_cases, output)
+                    print_success(f"\nSaved test cases to {output}")
+                elif output.endswith('.md'):
+                    generator.export_to_markdown(test_cases, output)
+                    print_success(f"\nSaved test cases to {output}")
+                else:
+                    print_error("Output file must end with .json or .md")
+
+    except Exception as e:
+        print_error(f"Failed to generate test cases: {e}")
+        return
+
+
+def _generate_packed(generator, chunk, count):
+    """Generate one group of stories, returning one result per story"""
+    try:
+        if len(chunk) == 1:
+            return [generator.generate_test_cases(chunk[0], num_cases=count)]
+        return generator.generate_test_cases_multi(chunk, num_cases=count)
+    except Exception as e:
+        return [e] * len(chunk)
+
+
+def _read_stories(file_path):
+    """Yield the user stories in a file one at a time, skipping blank lines"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            story = line.strip()
+            if story:
+                yield story
+
+
+def _chunked(stories, size):
+    """Yield (start index, list of up to `size` stories) without reading ahead"""
+    stories = iter(stories)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(stories, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+async def _generate_all(generator, stories, count, on_result, concurrency=10, rpm=None, tpm=None,
+                        pack=1):
+    """
+    Generate test cases for every story concurrently.
+
+    Stories are sent `pack` at a time in a single request, and the rate
+    limiter keeps us under the requests/tokens per minute allowed by your
+    OpenAI account. `concurrency` workers take groups of stories from a
+    small queue, so requests start as soon as the first lines are read and
+    only a few stories are held in memory, however big the file is. A
+    shared semaphore keeps it at `concurrency` requests in flight, even
+    when a cut-off group is re-sent one story at a time.
+
+    on_result(index, story, result) is called for each story as soon as
+    its request finishes. Failed stories get the exception as their result
+    instead of stopping the batch.
+    """
+    from test_case_generator import RateLimiter
+
+    rate_limiter = RateLimiter(max_requests_per_minute=rpm, max_tokens_per_minute=tpm)
+    semaphore = asyncio.Semaphore(concurrency)
+    queue = asyncio.Queue(maxsize=concurrency)
+
+    async def produce():
+        for item in _chunked(stories, pack):
+            await queue.put(item)
+        # One "stop" signal per worker
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            start, chunk = item
+            try:
+                if len(chunk) == 1:
+                    results = [await generator.agenerate_test_cases(
+                        chunk[0], num_cases=count,
+                        semaphore=semaphore, rate_limiter=rate_limiter
+                    )]
+                else:
+                    results = await generator.agenerate_test_cases_multi(
+                        chunk, num_cases=count,
+                        semaphore=semaphore, rate_limiter=rate_limiter
+                    )
+            except Exception as e:
+                results = [e] * len(chunk)
+
+            for offset, (story, result) in enumerate(zip(chunk, results)):
+                on_result(start + offset, story, result)
+
+    tasks = [asyncio.ensure_future(produce())]
+    tasks += [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _export_story(generator, base_name, test_cases, output_dir):
+    """Save one story's test cases as JSON and Markdown"""
+    json_path = os.path.join(output_dir, f"{base_name}.json")
+    md_path = os.path.join(output_dir, f"{base_name}.md")
+
+    generator.export_to_json(test_cases, json_path)
+    generator.export_to_markdown(test_cases, md_path)
 
-        # Display test cases in terminal
-        print_success(f"Generated {len(test_cases)} test cases!\n")
 
-        for i, tc in enumerate(test_cases, 1):
-            print_test_case(tc, i)
+def _progress_step(done):
+    """How often to show progress: 1 below 10 stories, 10 below 100, and so on"""
+    return 10 ** (len(str(done)) - 1)
 
-        # Save to file if requested
-        if output:
-            if output.endswith('.json'):
-                generator.export_to_json(test_cases, output)
-                print_success(f"\nSaved test cases to {output}")
-            elif output.endswith('.md'):
-                generator.export_to_markdown(test_cases, output)
-                print_success(f"\nSaved test cases to {output}")
+
+class _BatchReport:
+    """
+    Saves and reports each story's results while a batch is running.
+
+    Files are written on worker threads as soon as a story is ready, so
+    saving overlaps with requests that are still running. Stories are
+    reported in the order their results came in: each one once its files
+    are saved (failures straight away if nothing is ahead of them), and
+    then forgotten.
+
+    Failures are always shown. Successes are shown for each of the first
+    10 stories, then every 10th up to 100, then every 100th, so big
+    batches don't flood the screen (or log).
+    """
+
+    def __init__(self, generator, executor, output_dir, quiet=False):
+        self.generator = generator
+        self.executor = executor
+        self.output_dir = output_dir
+        self.quiet = quiet
+        self.total = 0
+        self.failed = 0
+        # (story number, story, test case count or error, write future), oldest
+        # first. Failures have no future, but still wait behind earlier stories
+        self._pending = collections.deque()
+
+    def add(self, index, story, result):
+        """Handle the result (test cases or exception) for one story"""
+        if isinstance(result, Exception):
+            self._pending.append((index + 1, story, result, None))
+        else:
+            future = self.executor.submit(
+                _export_story, self.generator, f"story_{index + 1:03d}", result, self.output_dir
+            )
+            self._pending.append((index + 1, story, len(result), future))
+        self._report_saved()
+
+    def finish(self):
+        """Wait for the remaining files to be saved and report them"""
+        self._report_saved(wait=True)
+
+    def _report_saved(self, wait=False):
+        while self._pending and (wait or self._pending[0][3] is None
+                                 or self._pending[0][3].done()):
+            number, story, outcome, future = self._pending.popleft()
+            if future is None:
+                self._report(number, story, f"Failed: {outcome}")
+                continue
+            try:
+                future.result()
+            except Exception as e:
+                self._report(number, story, f"Failed to save: {e}")
             else:
-                print_error("Output file must end with .json or .md")
+                self._report(number, story, None, outcome)
+
+    def _report(self, number, story, error, num_cases=0):
+        self.total += 1
+        if error:
+            self.failed += 1
+        elif self.quiet or self.total % _progress_step(self.total):
+            return
+
+        print_info(f"\nStory {number}:")
+        print(f"  {story[:80]}...")
+
+        if error:
+            print_error(f"  {error}")
+        else:
+            print_success(f"  Generated {num_cases} test cases")
 
+
+def save_story_results(generator, base_name, result, output_dir):
+    """Save one story's test cases as JSON and Markdown, or report its error"""
+    if isinstance(result, Exception):
+        print_error(f"  Failed: {result}")
+        return
+
+    try:
+        _export_story(generator, base_name, result, output_dir)
     except Exception as e:
-        print_error(f"Failed to generate test cases: {e}")
+        print_error(f"  Failed to save: {e}")
         return
 
+    print_success(f"  Generated {len(result)} test cases")
+
 
 @cli.command()
 @click.argument('file_path', type=click.Path(exists=True))
 @click.option('--count', '-c', default=5, help='Number of test cases per story')
 @click.option('--output-dir', '-o', default='output', help='Output directory for generated tests')
-def batch(file_path, count, output_dir):
+@click.option('--mode', type=click.Choice(['sync', 'async', 'batchapi']), default='async',
+              help='sync: one story at a time, async: many at once (default), '
+                   'batchapi: OpenAI Batch API (half price, results within 24h)')
+@click.option('--pack', default=5, type=click.IntRange(min=1),
+              help='User stories sent together in one request (default: 5, not used by batchapi)')
+@click.option('--concurrency', default=10, type=click.IntRange(min=1),
+              help='Maximum requests to run at once (default: 10)')
+@click.option('--rpm', type=click.FloatRange(min=0, min_open=True),
+              help='Maximum requests per minute (default: no limit)')
+@click.option('--tpm', type=click.FloatRange(min=0, min_open=True),
+              help='Maximum tokens per minute (default: no limit)')
+@click.option('--no-cache', is_flag=True, help='Always call OpenAI, never read or save cached answers')
+@click.option('--refresh-cache', is_flag=True, help='Ignore cached answers and save fresh ones')
+@click.option('--quiet', '-q', is_flag=True, help='Only report failed stories, not every story')
+def batch(file_path, count, output_dir, mode, pack, concurrency, rpm, tpm, no_cache, refresh_cache,
+          quiet):
     """
     Generate test cases for multiple user stories from a file.
 
@@ -141,47 +409,120 @@ def batch(file_path, count, output_dir):
 
     Example:
     python cli.py batch stories.txt --output-dir test_output
+
+    Staying under your account's rate limits:
+    python cli.py batch stories.txt --concurrency 5 --rpm 500
+
+    Half-price processing with the OpenAI Batch API:
+    python cli.py batch stories.txt --mode batchapi
     """
     print_info(f"Reading user stories from {file_path}...")
 
     # Get API key
-    api_key = os.getenv('OPENAI_API_KEY')
+    api_key = _env().get('OPENAI_API_KEY')
     if not api_key:
         print_error("OPENAI_API_KEY not found in .env file")
         return
 
-    # Read user stories
-    with open(file_path, 'r', encoding='utf-8') as f:
-        stories = [line.strip() for line in f if line.strip()]
+    from test_case_generator import AITestCaseGenerator, DEFAULT_CACHE_DIR
+
+    # Stories are read lazily, one line at a time, as they're needed
+    stories = _read_stories(file_path)
+
+    with AITestCaseGenerator(
+        api_key,
+        cache_dir=None if no_cache else DEFAULT_CACHE_DIR,
+        refresh_cache=refresh_cache
+    ) as generator:
+        if mode == 'batchapi':
+            # The Batch API needs every story up front in one upload
+            stories = list(stories)
+            print_info(f"Found {len(stories)} user stories")
+
+            # Hand everything to OpenAI and collect the results later
+            try:
+                batch_id = generator.submit_batch(stories, num_cases=count)
+            except Exception as e:
+                print_error(f"Failed to submit batch: {e}")
+                return
+
+            print_success(f"Submitted batch {batch_id}")
+            print_info("Results are usually ready within a few hours (at most 24h). Collect them with:")
+            print(f"  python cli.py wait-batch {batch_id} --output-dir {output_dir}")
+            return
 
-    print_info(f"Found {len(stories)} user stories")
+        # Create output directory
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Create output directory
-    os.makedirs(output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            report = _BatchReport(generator, executor, output_dir, quiet=quiet)
 
-    # Generate test cases for each story
-    generator = AITestCaseGenerator(api_key)
+            if mode == 'sync':
+                # One request at a time (slowest, but easiest on rate limits)
+                for start, chunk in _chunked(stories, pack):
+                    if not quiet:
+                        print_info(f"Processing stories {start + 1}-{start + len(chunk)}...")
+                    results = _generate_packed(generator, chunk, count)
+                    for offset, (story, result) in enumerate(zip(chunk, results)):
+                        report.add(start + offset, story, result)
+            else:
+                # Many requests at once
+                print_info(f"Sending requests to OpenAI ({concurrency} at a time)...")
 
-    for i, story in enumerate(stories, 1):
-        print_info(f"\nProcessing story {i}/{len(stories)}...")
-        print(f"  {story[:80]}...")
+                async def run_all():
+                    try:
+                        await _generate_all(generator, stories, count, report.add,
+                                            concurrency, rpm, tpm, pack)
+                    finally:
+                        # Close the async connections before the event loop ends
+                        await generator.aclose()
 
-        try:
-            test_cases = generator.generate_test_cases(story, num_cases=count)
+                asyncio.run(run_all())
 
-            # Save to files
-            base_name = f"story_{i:03d}"
-            json_path = os.path.join(output_dir, f"{base_name}.json")
-            md_path = os.path.join(output_dir, f"{base_name}.md")
+            report.finish()
 
-            generator.export_to_json(test_cases, json_path)
-            generator.export_to_markdown(test_cases, md_path)
+    print_success(f"\nCompleted {report.total} user stories ({report.failed} failed)! "
+                  f"Check {output_dir}/ for results")
 
-            print_success(f"  Generated {len(test_cases)} test cases")
 
+@cli.command(name='wait-batch')
+@click.argument('batch_id')
+@click.option('--output-dir', '-o', default='output', help='Output directory for generated tests')
+@click.option('--poll-interval', default=30, type=click.IntRange(min=1),
+              help='Seconds between status checks (default: 30)')
+def wait_batch(batch_id, output_dir, poll_interval):
+    """
+    Wait for a Batch API job and save its test cases.
+
+    Use the batch ID printed by: python cli.py batch stories.txt --mode batchapi
+
+    Example:
+    python cli.py wait-batch batch_abc123 --output-dir test_output
+    """
+    api_key = _env().get('OPENAI_API_KEY')
+    if not api_key:
+        print_error("OPENAI_API_KEY not found in .env file")
+        return
+
+    from test_case_generator import AITestCaseGenerator
+
+    with AITestCaseGenerator(api_key) as generator:
+        print_info(f"Waiting for batch {batch_id} (checking every {poll_interval}s)...")
+        try:
+            finished = generator.wait_for_batch(batch_id, poll_interval=poll_interval)
+            results = generator.fetch_batch_results(finished)
         except Exception as e:
-            print_error(f"  Failed: {e}")
-            continue
+            print_error(f"Failed to get batch results: {e}")
+            return
+
+    if finished.status != 'completed':
+        print_error(f"Batch ended with status '{finished.status}', saving what finished")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    for custom_id in sorted(results):
+        print_info(f"\n{custom_id}:")
+        save_story_results(generator, custom_id, results[custom_id], output_dir)
 
     print_success(f"\nCompleted! Check {output_dir}/ for results")
 
@@ -193,9 +534,10 @@ def setup():
 
     Walks you through creating a .env file with your OpenAI API key.
     """
-    print(f"{Fore.YELLOW}{'=' * 60}{Style.RESET_ALL}")
-    print(f"{Fore.YELLOW}AI Test Case Generator - Setup{Style.RESET_ALL}")
-    print(f"{Fore.YELLOW}{'=' * 60}{Style.RESET_ALL}\n")
+    c = _colors()
+    print(f"{c.YELLOW}{'=' * 60}{c.RESET}")
+    print(f"{c.YELLOW}AI Test Case Generator - Setup{c.RESET}")
+    print(f"{c.YELLOW}{'=' * 60}{c.RESET}\n")
 
     print_info("This tool requires an OpenAI API key to function.")
     print_info("Get your key from: https://platform.openai.com/api-keys\n")
@@ -229,7 +571,8 @@ def examples():
     Helpful for learning how to write good user stories
     and use the tool effectively.
     """
-    print(f"\n{Fore.YELLOW}Example User Stories:{Style.RESET_ALL}\n")
+    c = _colors()
+    print(f"\n{c.YELLOW}Example User Stories:{c.RESET}\n")
 
     examples = [
         {
@@ -255,10 +598,10 @@ def examples():
     ]
 
     for i, ex in enumerate(examples, 1):
-        print(f"{Fore.CYAN}{i}. {ex['title']}{Style.RESET_ALL}")
+        print(f"{c.CYAN}{i}. {ex['title']}{c.RESET}")
         print(f"   {ex['story']}\n")
 
-    print(f"\n{Fore.YELLOW}Example Commands:{Style.RESET_ALL}\n")
+    print(f"\n{c.YELLOW}Example Commands:{c.RESET}\n")
 
     commands = [
         ("Basic usage", 'python cli.py generate "Your user story here"'),
@@ -266,10 +609,11 @@ def examples():
         ("Focus on security", 'python cli.py generate "Your story" --focus security'),
         ("Save to file", 'python cli.py generate "Your story" --output tests.md'),
         ("Batch processing", 'python cli.py batch user_stories.txt'),
+        ("Half-price batch", 'python cli.py batch user_stories.txt --mode batchapi'),
     ]
 
     for desc, cmd in commands:
-        print(f"{Fore.CYAN}{desc}:{Style.RESET_ALL}")
+        print(f"{c.CYAN}{desc}:{c.RESET}")
         print(f"  {cmd}\n")
 
 
@@ -7,15 +7,129 @@ and this tool creates structured test cases to verify that feature works.
 """
 
 import openai
+import asyncio
+import hashlib
 import json
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import operator
+import os
+import random
+import re
+import textwrap
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+from dataclasses import dataclass, fields
 import logging
 
 # Set up logging to track what's happening
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Errors that usually go away if we wait and try again
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# Where generated answers are cached so repeated stories don't cost money
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-tc-gen")
+
+# orjson parses and writes JSON several times faster than the built-in
+# json module. It's optional: without it we use the built-in module.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# HTTP/2 lets many requests share one connection, but needs the optional
+# "h2" package. Without it we fall back to HTTP/1.1 keep-alive connections.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ResponseTruncatedError(Exception):
+    """The AI's answer hit the model's output token limit and was cut off."""
+
+
+def _check_finished(response):
+    """Raise ResponseTruncatedError if the answer was cut off."""
+    if response.choices[0].finish_reason == "length":
+        raise ResponseTruncatedError("The AI's answer was cut off at the model's token limit")
+
+
+def _json_loads(text):
+    """Parse a JSON string, using orjson when it's installed."""
+    if orjson:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _is_complete(result) -> bool:
+    """
+    Check that a parsed answer is worth caching.
+
+    That means at least one test case, and for packed requests, test cases
+    for every story (no missing stories reported as an Exception).
+    """
+    if not result:
+        return False
+    for item in result:
+        if isinstance(item, Exception) or (isinstance(item, list) and not item):
+            return False
+    return True
+
+
+# Finds the start of the test case list in a (partial) JSON answer
+_TEST_CASES_START = re.compile(r'"test_cases"\s*:\s*\[')
+
+
+def _iter_test_case_dicts(chunks: Iterable[str]) -> Iterator[Dict]:
+    """
+    Yield each item of the "test_cases" list as soon as it is complete.
+
+    The AI's answer arrives in small text chunks. Instead of waiting for
+    the whole thing, we keep the unread text in a buffer and try to decode
+    the next list item every time more text arrives. An item that is only
+    half-received simply fails to decode until the rest shows up.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    in_list = False
+
+    for chunk in chunks:
+        buffer += chunk
+
+        if not in_list:
+            match = _TEST_CASES_START.search(buffer)
+            if not match:
+                continue
+            buffer = buffer[match.end():]
+            in_list = True
+
+        while True:
+            # Skip the commas and whitespace between list items
+            pos = 0
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if buffer[pos:pos + 1] == "]":
+                return
+            if pos == len(buffer):
+                buffer = ""
+                break
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Not all of this item has arrived yet
+                buffer = buffer[pos:]
+                break
+
+            buffer = buffer[end:]
+            yield item
+
 
 @dataclass
 class TestCase:
@@ -24,7 +138,16 @@ class TestCase:
 
     A dataclass is a convenient way to store related data together.
     Think of it like a form with fields that must be filled out.
+
+    __slots__ stores the fields directly on the object instead of in a
+    per-object dictionary, which saves memory when a batch run creates
+    thousands of them.
     """
+    __slots__ = (
+        "title", "description", "steps", "expected_result",
+        "test_type", "priority", "preconditions",
+    )
+
     title: str              # Brief name for the test
     description: str        # What this test verifies
     steps: List[str]        # Numbered steps to execute
@@ -34,6 +157,187 @@ class TestCase:
     preconditions: List[str]  # What must be set up before testing
 
 
+# Every field a test case has, and what to use when the AI leaves one out.
+# The list fields (steps, preconditions) default to a new empty list.
+_TEST_CASE_FIELD_NAMES = tuple(field.name for field in fields(TestCase))
+_TEST_CASE_FIELDS = frozenset(_TEST_CASE_FIELD_NAMES)
+_TEST_CASE_LIST_FIELDS = frozenset(
+    field.name for field in fields(TestCase) if field.type == List[str]
+)
+_TEST_CASE_DEFAULTS = {
+    "title": "Untitled Test",
+    "description": "",
+    "expected_result": "",
+    "test_type": "integration",
+    "priority": "medium",
+}
+
+# Reads every field of a test case in one call, in declaration order
+_get_test_case_values = operator.attrgetter(*_TEST_CASE_FIELD_NAMES)
+
+
+def _clean_test_case_values(values: Dict):
+    """
+    Replace null fields with their defaults, and raise TypeError if a
+    field has the wrong type.
+
+    The AI sometimes answers with e.g. all the steps in one string, which
+    would otherwise be exported one character per step.
+    """
+    for name, value in values.items():
+        is_list = name in _TEST_CASE_LIST_FIELDS
+        if value is None:
+            values[name] = [] if is_list else _TEST_CASE_DEFAULTS[name]
+        elif not isinstance(value, list if is_list else str):
+            raise TypeError(f"{name} should be a {'list' if is_list else 'string'}, got {value!r}")
+
+
+# Instructions sent to the AI. The {placeholders} are filled in per request
+# with str.format_map. Both prompts end with the same instructions, so they
+# can't drift apart.
+_PROMPT_INSTRUCTIONS = """
+Include:
+- Positive test cases (happy path - when everything goes right)
+- Negative test cases (error scenarios - what if user does something wrong?)
+- Edge cases (boundary conditions - extreme or unusual situations)
+- Security considerations (what could go wrong security-wise?)
+
+Return ONLY valid JSON in this exact format{format_note}:
+{answer_format}
+
+Ensure test cases are:
+- Specific and actionable
+- Include actual test data examples
+- Cover different scenarios
+- Practical to implement
+"""
+
+_PROMPT_TEMPLATE = """
+Given this user story:
+"{user_story}"
+
+Generate exactly {num_cases} comprehensive test cases in JSON format.{focus_text}
+""" + _PROMPT_INSTRUCTIONS
+
+_MULTI_PROMPT_TEMPLATE = """
+Given these {num_stories} user stories:
+{story_text}
+
+For EACH story, generate exactly {num_cases} comprehensive test cases in JSON format.{focus_text}
+""" + _PROMPT_INSTRUCTIONS
+
+# The answer layouts shown to the AI. These are passed in as values, so
+# their braces are single.
+_TEST_CASE_EXAMPLE = """{
+  "title": "Brief descriptive title",
+  "description": "What this test verifies",
+  "steps": ["Step 1", "Step 2", "Step 3"],
+  "expected_result": "What should happen",
+  "test_type": "unit|integration|e2e",
+  "priority": "high|medium|low",
+  "preconditions": ["What must be set up first"]
+}"""
+
+_ANSWER_FORMAT = """{
+  "test_cases": [
+%s
+  ]
+}""" % textwrap.indent(_TEST_CASE_EXAMPLE, " " * 4)
+
+_MULTI_ANSWER_FORMAT = """{
+  "results": {
+    "0": {
+      "test_cases": [
+%s
+      ]
+    }
+  }
+}""" % textwrap.indent(_TEST_CASE_EXAMPLE, " " * 8)
+
+
+def _focus_text(focus_areas: Optional[List[str]]) -> str:
+    """The prompt line asking the AI to focus on certain areas, if any."""
+    if not focus_areas:
+        return ""
+    return f"\nPay special attention to: {', '.join(focus_areas)}"
+
+
+class RateLimiter:
+    """
+    Keeps async requests under OpenAI's per-minute limits.
+
+    Works like a bucket that slowly refills: every request takes one
+    request slot and some tokens out of the bucket, and waits if there
+    isn't enough left. Leave a limit as None to not enforce it.
+    """
+
+    def __init__(
+        self,
+        max_requests_per_minute: Optional[float] = None,
+        max_tokens_per_minute: Optional[float] = None
+    ):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+
+        # Start with a full bucket
+        self._requests_available = max_requests_per_minute or 0
+        self._tokens_available = max_tokens_per_minute or 0
+        self._last_update = time.monotonic()
+
+    def _refill(self):
+        """Add back the capacity earned since the last check."""
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+
+        if self.max_requests_per_minute:
+            self._requests_available = min(
+                self.max_requests_per_minute,
+                self._requests_available + self.max_requests_per_minute * elapsed / 60
+            )
+        if self.max_tokens_per_minute:
+            self._tokens_available = min(
+                self.max_tokens_per_minute,
+                self._tokens_available + self.max_tokens_per_minute * elapsed / 60
+            )
+
+    async def acquire(self, tokens: int):
+        """Wait until there is room for one more request of this size."""
+        # A single request can never need more than the whole bucket
+        # (with under 1 request per minute, the bucket never holds a whole one)
+        requests = min(1, self.max_requests_per_minute or 1)
+        if self.max_tokens_per_minute:
+            tokens = min(tokens, self.max_tokens_per_minute)
+
+        while True:
+            self._refill()
+            has_request = (not self.max_requests_per_minute
+                           or self._requests_available >= requests)
+            has_tokens = (not self.max_tokens_per_minute
+                          or self._tokens_available >= tokens)
+
+            if has_request and has_tokens:
+                if self.max_requests_per_minute:
+                    self._requests_available -= requests
+                if self.max_tokens_per_minute:
+                    self._tokens_available -= tokens
+                return
+
+            await asyncio.sleep(0.1)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """
+        Correct our token guess once OpenAI tells us the real usage.
+
+        A request that failed used nothing, so pass actual_tokens=0 to give
+        back everything acquire() set aside for it.
+        """
+        if self.max_tokens_per_minute:
+            # acquire() never takes more than the whole bucket
+            estimated_tokens = min(estimated_tokens, self.max_tokens_per_minute)
+            self._tokens_available -= actual_tokens - estimated_tokens
+
+
 class AITestCaseGenerator:
     """
     Main class that handles test case generation.
@@ -44,21 +348,76 @@ class AITestCaseGenerator:
     3. Get back structured test cases
     """
 
-    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-3.5-turbo",
+        cache_dir: Optional[str] = None,
+        refresh_cache: bool = False
+    ):
         """
         Initialize the generator with API credentials.
 
         Args:
             api_key: Your OpenAI API key (keep this secret!)
             model: Which AI model to use (default is gpt-3.5-turbo)
+            cache_dir: Folder for saving answers so identical requests are
+                       free next time (default: None, no caching)
+            refresh_cache: Ignore saved answers, but still save new ones
         """
         if not api_key:
             raise ValueError("API key is required. Get one from https://platform.openai.com/api-keys")
 
-        self.client = openai.OpenAI(api_key=api_key)
+        # One HTTP client per API client, reused for every request, so we
+        # only pay for connecting (and the TLS handshake) once
+        self.client = openai.OpenAI(
+            api_key=api_key,
+            http_client=openai.DefaultHttpxClient(http2=HTTP2_AVAILABLE)
+        )
+        # Async client lets batch runs send many requests at once. It's only
+        # created on first use, inside the event loop that will use it
+        self._api_key = api_key
+        self._async_client = None
         self.model = model
+        self.cache_dir = cache_dir
+        self.refresh_cache = refresh_cache
         logger.info(f"Initialized AI Test Case Generator with model: {model}")
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """The async OpenAI client, created the first time it's needed."""
+        if self._async_client is None:
+            # We retry failed requests ourselves (see _arun_with_retry), so
+            # the SDK's own retries are turned off to not multiply attempts
+            self._async_client = openai.AsyncOpenAI(
+                api_key=self._api_key,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(http2=HTTP2_AVAILABLE)
+            )
+        return self._async_client
+
+    def close(self):
+        """Close the HTTP connections used by generate_test_cases and friends."""
+        self.client.close()
+
+    async def aclose(self):
+        """
+        Close the HTTP connections used by the async methods, if any were made.
+
+        Call this from inside the same event loop that made the requests.
+        The next async call opens a fresh client, so the generator can be
+        used again from another event loop.
+        """
+        if self._async_client is not None:
+            client, self._async_client = self._async_client, None
+            await client.close()
+
     def generate_test_cases(
         self,
         user_story: str,
@@ -87,38 +446,330 @@ class AITestCaseGenerator:
         # Build the prompt (instructions) for the AI
         prompt = self._build_prompt(user_story, num_cases, focus_areas)
 
+        return self._run(prompt, self._parse_content)
+
+    def stream_test_cases(
+        self,
+        user_story: str,
+        num_cases: int = 5,
+        focus_areas: Optional[List[str]] = None
+    ) -> Iterator[TestCase]:
+        """
+        Generate test cases, handing back each one as soon as it arrives.
+
+        Same as generate_test_cases, but the answer is streamed from OpenAI
+        so the first test case can be shown after a few seconds instead of
+        waiting for all of them.
+
+        Yields:
+            TestCase objects, one at a time
+
+        Raises:
+            ResponseTruncatedError: after the last complete test case, if
+                the answer was cut off at the model's token limit
+        """
+        logger.info(f"Generating {num_cases} test cases for user story...")
+
+        prompt = self._build_prompt(user_story, num_cases, focus_areas)
+        body = self._request_body(prompt)
+
         try:
-            # Call OpenAI's API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert QA engineer and test case designer. "
-                                   "Generate comprehensive, practical test cases that cover "
-                                   "positive scenarios, negative scenarios, edge cases, and security."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},  # Ensure JSON response
-                temperature=0.7  # Controls creativity (0-1, higher = more creative)
+            cached = self._from_cache(body, self._parse_content)
+            if cached is not None:
+                yield from cached
+                return
+
+            stream = self.client.chat.completions.create(**body, stream=True)
+
+            # Keep every chunk so we can fall back to parsing the whole answer
+            received = []
+            # Why the answer ended; the last chunk says, e.g. "stop" or "length"
+            finish_reasons = []
+
+            def text_chunks():
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    if choice.finish_reason:
+                        finish_reasons.append(choice.finish_reason)
+                    if choice.delta.content:
+                        received.append(choice.delta.content)
+                        yield received[-1]
+
+            # Closing the stream hands its connection back to the shared client,
+            # even if the caller stops reading early
+            with stream:
+                chunks = text_chunks()
+
+                count = 0
+                for case_data in _iter_test_case_dicts(chunks):
+                    test_case = self._parse_test_case(case_data)
+                    if test_case:
+                        count += 1
+                        yield test_case
+
+                # Parsing stops at the end of the list; read the rest of the answer
+                for _ in chunks:
+                    pass
+
+            if "length" in finish_reasons:
+                raise ResponseTruncatedError(
+                    f"The AI's answer was cut off at the model's token limit "
+                    f"after {count} test cases, ask for fewer"
+                )
+
+            content = "".join(received)
+            if count == 0:
+                # The AI used a different layout (e.g. "tests"), parse it all at once
+                for test_case in self._parse_test_cases(_json_loads(content)):
+                    count += 1
+                    yield test_case
+
+            # Only keep complete answers that will parse again next time
+            if count:
+                try:
+                    _json_loads(content)
+                except ValueError:
+                    logger.warning("Not caching a response that doesn't parse")
+                else:
+                    self._cache_put(body, content)
+            logger.info(f"Generated {count} test cases successfully")
+
+        except openai.APIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise Exception(f"Failed to generate test cases: {e}")
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON response: {e}")
+            raise Exception(f"Invalid response format from AI: {e}")
+
+    def generate_test_cases_multi(
+        self,
+        stories: List[str],
+        num_cases: int = 5,
+        focus_areas: Optional[List[str]] = None
+    ) -> List[object]:
+        """
+        Generate test cases for several user stories in a single request.
+
+        Packing stories together means fewer requests (so fewer rate limit
+        problems) and the instructions are only sent once for all of them.
+        If the answer for all of them is too long and gets cut off, each
+        story is sent on its own instead.
+
+        Args:
+            stories: User stories to generate test cases for
+            num_cases: How many test cases to generate per story
+            focus_areas: Specific areas to focus on
+
+        Returns:
+            One entry per story, in order: its list of TestCase objects,
+            or an Exception if the AI left that story out or it failed
+        """
+        logger.info(f"Generating {num_cases} test cases for {len(stories)} user stories...")
+
+        prompt = self._build_multi_prompt(stories, num_cases, focus_areas)
+
+        try:
+            return self._run(prompt, lambda c: self._parse_multi_content(c, len(stories)))
+        except ResponseTruncatedError:
+            # Too many stories for one answer, so ask for each one on its own
+            logger.warning(f"Answer for {len(stories)} stories was cut off, "
+                           f"sending them one at a time")
+
+        results = []
+        for story in stories:
+            try:
+                results.append(self.generate_test_cases(story, num_cases, focus_areas))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def agenerate_test_cases(
+        self,
+        user_story: str,
+        num_cases: int = 5,
+        focus_areas: Optional[List[str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        rate_limiter: Optional["RateLimiter"] = None,
+        max_attempts: int = 5
+    ) -> List[TestCase]:
+        """
+        Async version of generate_test_cases.
+
+        Waiting on the network is most of the work, so running many of
+        these together (e.g. with asyncio.gather) is much faster than
+        generating one story after another.
+
+        Args:
+            user_story: Description of what the user wants to do
+            num_cases: How many test cases to generate (default: 5)
+            focus_areas: Specific areas to focus on
+            semaphore: Shared semaphore limiting how many requests run at once
+            rate_limiter: Shared RateLimiter keeping us under OpenAI's limits
+            max_attempts: How many times to try before giving up on rate limits
+                          and temporary server errors (default: 5)
+
+        Returns:
+            List of TestCase objects with all test details
+        """
+        logger.info(f"Generating {num_cases} test cases for user story...")
+
+        prompt = self._build_prompt(user_story, num_cases, focus_areas)
+
+        # Rough guess: ~4 characters per token, plus room for the answer
+        estimated_tokens = len(prompt) // 4 + num_cases * 200
+
+        return await self._arun(
+            prompt, self._parse_content, estimated_tokens,
+            semaphore, rate_limiter, max_attempts
+        )
+
+    async def agenerate_test_cases_multi(
+        self,
+        stories: List[str],
+        num_cases: int = 5,
+        focus_areas: Optional[List[str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        rate_limiter: Optional["RateLimiter"] = None,
+        max_attempts: int = 5
+    ) -> List[object]:
+        """
+        Async version of generate_test_cases_multi.
+
+        Takes the same semaphore/rate limiter/retry options as
+        agenerate_test_cases.
+        """
+        logger.info(f"Generating {num_cases} test cases for {len(stories)} user stories...")
+
+        prompt = self._build_multi_prompt(stories, num_cases, focus_areas)
+        estimated_tokens = len(prompt) // 4 + num_cases * 200 * len(stories)
+
+        try:
+            return await self._arun(
+                prompt, lambda c: self._parse_multi_content(c, len(stories)),
+                estimated_tokens, semaphore, rate_limiter, max_attempts
             )
+        except ResponseTruncatedError:
+            logger.warning(f"Answer for {len(stories)} stories was cut off, "
+                           f"sending them one at a time")
+
+        return await asyncio.gather(
+            *(self.agenerate_test_cases(story, num_cases, focus_areas,
+                                        semaphore, rate_limiter, max_attempts)
+              for story in stories),
+            return_exceptions=True
+        )
+
+    def _run(self, prompt: str, parse_content):
+        """
+        Send one request to OpenAI and parse the answer with parse_content.
+        """
+        body = self._request_body(prompt)
+
+        cached = self._from_cache(body, parse_content)
+        if cached is not None:
+            return cached
+
+        try:
+            # Call OpenAI's API
+            response = self.client.chat.completions.create(**body)
+            _check_finished(response)
 
             # Extract and parse the response
             content = response.choices[0].message.content
             logger.info("Successfully received response from OpenAI")
 
-            # Convert JSON string to Python objects
-            test_data = json.loads(content)
+            result = parse_content(content)
+            if _is_complete(result):
+                self._cache_put(body, content)
+            return result
+
+        except openai.APIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise Exception(f"Failed to generate test cases: {e}")
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON response: {e}")
+            raise Exception(f"Invalid response format from AI: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+            raise
+
+    async def _arun(
+        self,
+        prompt: str,
+        parse_content,
+        estimated_tokens: int,
+        semaphore: Optional[asyncio.Semaphore],
+        rate_limiter: Optional["RateLimiter"],
+        max_attempts: int
+    ):
+        """
+        Async version of _run, with concurrency and rate limits applied.
+        """
+        body = self._request_body(prompt)
+
+        # Cached answers don't need a slot or any rate limit budget
+        cached = self._from_cache(body, parse_content)
+        if cached is not None:
+            return cached
+
+        if semaphore is None:
+            return await self._arun_with_retry(
+                body, parse_content, estimated_tokens, rate_limiter, max_attempts
+            )
+
+        # Wait for a free slot so we never have too many requests in flight
+        async with semaphore:
+            return await self._arun_with_retry(
+                body, parse_content, estimated_tokens, rate_limiter, max_attempts
+            )
+
+    async def _arun_with_retry(
+        self,
+        body: Dict,
+        parse_content,
+        estimated_tokens: int,
+        rate_limiter: Optional["RateLimiter"],
+        max_attempts: int
+    ):
+        """
+        Send one async request, retrying with exponential backoff.
+
+        Each retry waits twice as long as the last one (1s, 2s, 4s...,
+        capped at 60s) plus a random fraction of a second, so many
+        requests that failed together don't all retry at the same moment.
+        """
+        try:
+            for attempt in range(max_attempts):
+                if rate_limiter:
+                    await rate_limiter.acquire(estimated_tokens)
+
+                try:
+                    response = await self.async_client.chat.completions.create(**body)
+                except RETRYABLE_ERRORS as e:
+                    if rate_limiter:
+                        # A failed request used none of the tokens we set aside
+                        rate_limiter.record_usage(estimated_tokens, 0)
+                    # An account that's out of credit won't recover by waiting
+                    if attempt == max_attempts - 1 or e.code == "insufficient_quota":
+                        raise
+                    delay = min(2 ** attempt, 60) + random.random()
+                    logger.warning(f"Request failed ({e}), retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    continue
+
+                if rate_limiter and response.usage:
+                    rate_limiter.record_usage(estimated_tokens, response.usage.total_tokens)
+                _check_finished(response)
 
-            # Convert dictionary data to TestCase objects
-            test_cases = self._parse_test_cases(test_data)
+                content = response.choices[0].message.content
+                logger.info("Successfully received response from OpenAI")
 
-            logger.info(f"Generated {len(test_cases)} test cases successfully")
-            return test_cases
+                result = parse_content(content)
+                if _is_complete(result):
+                    self._cache_put(body, content)
+                return result
 
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {e}")
@@ -130,6 +781,242 @@ class AITestCaseGenerator:
             logger.error(f"Unexpected error: {e}")
             raise
 
+    def _cache_path(self, body: Dict) -> str:
+        """
+        Work out where the answer to this request is cached.
+
+        The file name is a fingerprint (SHA-256 hash) of everything sent
+        to the AI: model, temperature and prompt. Change any of them and
+        it's a different file.
+        """
+        key = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _from_cache(self, body: Dict, parse_content):
+        """
+        Return the parsed cached answer for this request, if it's usable.
+
+        A cached answer that no longer parses, or is missing test cases,
+        is ignored so the request is simply sent to OpenAI again.
+        """
+        content = self._cache_get(body)
+        if content is None:
+            return None
+
+        try:
+            result = parse_content(content)
+        except (ValueError, TypeError, AttributeError):
+            result = None
+
+        if not _is_complete(result):
+            logger.warning("Ignoring unusable cached response")
+            return None
+        return result
+
+    def _cache_get(self, body: Dict) -> Optional[str]:
+        """Return the cached answer for this request, if there is one."""
+        if not self.cache_dir or self.refresh_cache:
+            return None
+
+        try:
+            with open(self._cache_path(body), 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        logger.info("Using cached response")
+        return content
+
+    def _cache_put(self, body: Dict, content: str):
+        """Save an answer so the same request is free next time."""
+        if not self.cache_dir:
+            return
+
+        path = self._cache_path(body)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so a crash never leaves half a file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache file {path}: {e}")
+
+    def submit_batch(
+        self,
+        stories: List[str],
+        num_cases: int = 5,
+        focus_areas: Optional[List[str]] = None
+    ) -> str:
+        """
+        Submit many user stories through OpenAI's Batch API.
+
+        Batch jobs cost half as much as normal requests and have their own,
+        much higher rate limits. The catch: results can take up to 24 hours.
+        Use wait_for_batch() and fetch_batch_results() to collect them.
+
+        Args:
+            stories: User stories to generate test cases for
+            num_cases: How many test cases to generate per story
+            focus_areas: Specific areas to focus on
+
+        Returns:
+            The batch ID, needed later to download the results
+        """
+        # One request per line, tagged so we can match results to stories
+        lines = []
+        for i, story in enumerate(stories, 1):
+            prompt = self._build_prompt(story, num_cases, focus_areas)
+            lines.append(json.dumps({
+                "custom_id": f"story_{i:03d}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request_body(prompt)
+            }, ensure_ascii=False))
+
+        try:
+            batch_file = self.client.files.create(
+                file=("batch_input.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except openai.APIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise Exception(f"Failed to submit batch: {e}")
+
+        logger.info(f"Submitted batch {batch.id} with {len(stories)} user stories")
+        return batch.id
+
+    def wait_for_batch(self, batch_id: str, poll_interval: float = 30):
+        """
+        Check on a batch job until it has finished.
+
+        Returns:
+            The finished batch object from OpenAI
+        """
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                logger.info(f"Batch {batch_id} finished with status: {batch.status}")
+                return batch
+
+            counts = batch.request_counts
+            if counts:
+                logger.info(f"Batch {batch_id} is {batch.status} "
+                            f"({counts.completed}/{counts.total} done)")
+            else:
+                logger.info(f"Batch {batch_id} is {batch.status}")
+            time.sleep(poll_interval)
+
+    def fetch_batch_results(self, batch) -> Dict[str, object]:
+        """
+        Download a finished batch and turn each answer into test cases.
+
+        Returns:
+            Dictionary mapping each custom_id (e.g. "story_001") to its
+            list of TestCase objects, or to the Exception if it failed
+        """
+        if batch.status == "failed":
+            raise Exception(f"Batch {batch.id} failed: {batch.errors}")
+
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+
+            content = self.client.files.content(file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+
+                item = _json_loads(line)
+                custom_id = item["custom_id"]
+                response = item.get("response") or {}
+
+                if item.get("error") or response.get("status_code") != 200:
+                    error = item.get("error") or response.get("body", {}).get("error")
+                    results[custom_id] = Exception(f"Request failed: {error}")
+                    continue
+
+                try:
+                    content_text = response["body"]["choices"][0]["message"]["content"]
+                    results[custom_id] = self._parse_content(content_text)
+                except (KeyError, IndexError, json.JSONDecodeError) as e:
+                    results[custom_id] = Exception(f"Invalid response format from AI: {e}")
+
+        return results
+
+    def _request_body(self, prompt: str) -> Dict:
+        """
+        Build the chat completion request sent to OpenAI.
+
+        Shared by the normal, async and Batch API code paths so they
+        all ask the AI exactly the same thing.
+        """
+        return {
+            "model": self.model,
+            "messages": self._build_messages(prompt),
+            "response_format": {"type": "json_object"},  # Ensure JSON response
+            "temperature": 0.7  # Controls creativity (0-1, higher = more creative)
+        }
+
+    def _build_messages(self, prompt: str) -> List[Dict]:
+        """
+        Wrap the prompt in the chat messages sent to OpenAI.
+
+        The system message tells the AI what role to play.
+        """
+        return [
+            {
+                "role": "system",
+                "content": "You are an expert QA engineer and test case designer. "
+                           "Generate comprehensive, practical test cases that cover "
+                           "positive scenarios, negative scenarios, edge cases, and security."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    def _parse_content(self, content: str) -> List[TestCase]:
+        """
+        Turn the AI's JSON answer into TestCase objects.
+        """
+        # Convert JSON string to Python objects
+        test_data = _json_loads(content)
+
+        # Convert dictionary data to TestCase objects
+        test_cases = self._parse_test_cases(test_data)
+
+        logger.info(f"Generated {len(test_cases)} test cases successfully")
+        return test_cases
+
+    def _parse_multi_content(self, content: str, num_stories: int) -> List[object]:
+        """
+        Split a packed answer back into one result per story.
+
+        Stories the AI skipped get an Exception instead of test cases,
+        so one missing answer doesn't throw away the others.
+        """
+        results_data = _json_loads(content).get('results', {})
+
+        results = []
+        for i in range(num_stories):
+            story_data = results_data.get(str(i))
+            if story_data is None:
+                results.append(Exception(f"AI returned no test cases for story {i}"))
+            else:
+                results.append(self._parse_test_cases(story_data))
+
+        logger.info(f"Generated test cases for {num_stories} user stories")
+        return results
+
     def _build_prompt(
         self,
         user_story: str,
@@ -142,44 +1029,35 @@ class AITestCaseGenerator:
         A good prompt is like giving clear instructions to a helper.
         The clearer and more detailed, the better the results.
         """
-        focus_text = ""
-        if focus_areas:
-            focus_text = f"\nPay special attention to: {', '.join(focus_areas)}"
-
-        prompt = f"""
-Given this user story:
-"{user_story}"
+        return _PROMPT_TEMPLATE.format_map({
+            "user_story": user_story,
+            "num_cases": num_cases,
+            "focus_text": _focus_text(focus_areas),
+            "format_note": "",
+            "answer_format": _ANSWER_FORMAT,
+        })
 
-Generate exactly {num_cases} comprehensive test cases in JSON format.{focus_text}
+    def _build_multi_prompt(
+        self,
+        stories: List[str],
+        num_cases: int,
+        focus_areas: Optional[List[str]]
+    ) -> str:
+        """
+        Build one prompt asking for test cases for several user stories.
 
-Include:
-- Positive test cases (happy path - when everything goes right)
-- Negative test cases (error scenarios - what if user does something wrong?)
-- Edge cases (boundary conditions - extreme or unusual situations)
-- Security considerations (what could go wrong security-wise?)
+        Each story gets a number so the answers can be matched back up.
+        """
+        story_text = "\n".join(f'Story {i}: "{story}"' for i, story in enumerate(stories))
 
-Return ONLY valid JSON in this exact format:
-{{
-  "test_cases": [
-    {{
-      "title": "Brief descriptive title",
-      "description": "What this test verifies",
-      "steps": ["Step 1", "Step 2", "Step 3"],
-      "expected_result": "What should happen",
-      "test_type": "unit|integration|e2e",
-      "priority": "high|medium|low",
-      "preconditions": ["What must be set up first"]
-    }}
-  ]
-}}
-
-Ensure test cases are:
-- Specific and actionable
-- Include actual test data examples
-- Cover different scenarios
-- Practical to implement
-"""
-        return prompt
+        return _MULTI_PROMPT_TEMPLATE.format_map({
+            "num_stories": len(stories),
+            "story_text": story_text,
+            "num_cases": num_cases,
+            "focus_text": _focus_text(focus_areas),
+            "format_note": ", with one entry per story number",
+            "answer_format": _MULTI_ANSWER_FORMAT,
+        })
 
     def _parse_test_cases(self, test_data: Dict) -> List[TestCase]:
         """
@@ -194,23 +1072,33 @@ Ensure test cases are:
         cases_list = test_data.get('test_cases', test_data.get('tests', []))
 
         for case_data in cases_list:
-            try:
-                test_case = TestCase(
-                    title=case_data.get('title', 'Untitled Test'),
-                    description=case_data.get('description', ''),
-                    steps=case_data.get('steps', []),
-                    expected_result=case_data.get('expected_result', ''),
-                    test_type=case_data.get('test_type', 'integration'),
-                    priority=case_data.get('priority', 'medium'),
-                    preconditions=case_data.get('preconditions', [])
-                )
+            test_case = self._parse_test_case(case_data)
+            if test_case:
                 test_cases.append(test_case)
-            except Exception as e:
-                logger.warning(f"Skipping invalid test case: {e}")
-                continue
 
         return test_cases
 
+    def _parse_test_case(self, case_data: Dict) -> Optional[TestCase]:
+        """
+        Convert one test case dictionary into a TestCase object.
+
+        Returns None (and logs a warning) if the data is unusable.
+        """
+        try:
+            if case_data.keys() == _TEST_CASE_FIELDS:
+                # The AI filled in exactly the fields we asked for
+                values = case_data
+            else:
+                # Otherwise fill in missing fields and ignore any extra ones
+                values = {"steps": [], "preconditions": [], **_TEST_CASE_DEFAULTS}
+                values.update((key, case_data[key]) for key in case_data.keys() & _TEST_CASE_FIELDS)
+
+            _clean_test_case_values(values)
+            return TestCase(**values)
+        except Exception as e:
+            logger.warning(f"Skipping invalid test case: {e}")
+            return None
+
     def export_to_json(self, test_cases: List[TestCase], filename: str):
         """
         Save test cases to a JSON file.
@@ -218,23 +1106,20 @@ Ensure test cases are:
         JSON is a standard format that can be read by other tools,
         imported into test management systems, or shared with team members.
         """
-        output = {
-            "test_cases": [
-                {
-                    "title": tc.title,
-                    "description": tc.description,
-                    "steps": tc.steps,
-                    "expected_result": tc.expected_result,
-                    "test_type": tc.test_type,
-                    "priority": tc.priority,
-                    "preconditions": tc.preconditions
-                }
-                for tc in test_cases
-            ]
-        }
-
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        if orjson:
+            # orjson writes dataclasses itself, field by field, so there's
+            # no need to copy each test case into a dictionary first
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps({"test_cases": test_cases}, option=orjson.OPT_INDENT_2))
+        else:
+            output = {
+                "test_cases": [
+                    dict(zip(_TEST_CASE_FIELD_NAMES, _get_test_case_values(tc)))
+                    for tc in test_cases
+                ]
+            }
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(output, f, indent=2, ensure_ascii=False)
 
         logger.info(f"Exported {len(test_cases)} test cases to {filename}")
 
@@ -245,30 +1130,37 @@ Ensure test cases are:
         Markdown is easy to read and can be viewed in GitHub, Notion, etc.
         Great for documentation and sharing with non-technical team members.
         """
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write("# Test Cases\n\n")
+        # A large buffer lets the lines go to disk in a few big writes
+        with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(self._markdown_lines(test_cases))
 
-            for i, tc in enumerate(test_cases, 1):
-                f.write(f"## Test Case {i}: {tc.title}\n\n")
-                f.write(f"**Type:** {tc.test_type}  \n")
-                f.write(f"**Priority:** {tc.priority}  \n\n")
-                f.write(f"**Description:** {tc.description}\n\n")
+        logger.info(f"Exported {len(test_cases)} test cases to {filename}")
 
-                if tc.preconditions:
-                    f.write("**Preconditions:**\n")
-                    for precond in tc.preconditions:
-                        f.write(f"- {precond}\n")
-                    f.write("\n")
+    def _markdown_lines(self, test_cases: List[TestCase]) -> Iterator[str]:
+        """
+        Yield the Markdown document for export_to_markdown piece by piece.
+        """
+        yield "# Test Cases\n\n"
 
-                f.write("**Steps:**\n")
-                for j, step in enumerate(tc.steps, 1):
-                    f.write(f"{j}. {step}\n")
-                f.write("\n")
+        for i, tc in enumerate(test_cases, 1):
+            yield f"## Test Case {i}: {tc.title}\n\n"
+            yield f"**Type:** {tc.test_type}  \n"
+            yield f"**Priority:** {tc.priority}  \n\n"
+            yield f"**Description:** {tc.description}\n\n"
 
-                f.write(f"**Expected Result:** {tc.expected_result}\n\n")
-                f.write("---\n\n")
+            if tc.preconditions:
+                yield "**Preconditions:**\n"
+                for precond in tc.preconditions:
+                    yield f"- {precond}\n"
+                yield "\n"
 
-        logger.info(f"Exported {len(test_cases)} test cases to {filename}")
+            yield "**Steps:**\n"
+            for j, step in enumerate(tc.steps, 1):
+                yield f"{j}. {step}\n"
+            yield "\n"
+
+            yield f"**Expected Result:** {tc.expected_result}\n\n"
+            yield "---\n\n"
 
 
 # Example usage (this runs if you execute this file directly)
@@ -0,0 +1,52 @@
+"""
+Tests for how the batch command reports stories while saving them.
+"""
+
+from concurrent.futures import Future
+
+from cli import _BatchReport
+
+
+class ManualExecutor:
+    """Hands out futures that only finish when the test says so."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+def test_failure_is_reported_after_earlier_unsaved_story(capsys):
+    executor = ManualExecutor()
+    report = _BatchReport(None, executor, "output")
+
+    report.add(0, "Story A", ["test case"])
+    report.add(1, "Story B", ValueError("boom"))
+    # Story A's files aren't saved yet, so nothing can be reported
+    assert "Story" not in capsys.readouterr().out
+
+    executor.futures[0].set_result(None)
+    report.finish()
+
+    out = capsys.readouterr().out
+    assert out.index("Story 1:") < out.index("Story 2:")
+    assert "Failed: boom" in out
+    assert (report.total, report.failed) == (2, 1)
+
+
+def test_export_error_is_reported_as_that_storys_failure(capsys):
+    executor = ManualExecutor()
+    report = _BatchReport(None, executor, "output")
+
+    report.add(0, "Story A", ["test case"])
+    report.add(1, "Story B", ["test case"])
+    executor.futures[0].set_exception(UnicodeEncodeError("utf-8", "\ud800", 0, 1, "surrogate"))
+    executor.futures[1].set_result(None)
+    report.finish()
+
+    out = capsys.readouterr().out
+    assert "Failed to save" in out and "Story 2:" in out
+    assert (report.total, report.failed) == (2, 1)
@@ -0,0 +1,89 @@
+"""
+Tests for the on-disk answer cache.
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+from test_case_generator import AITestCaseGenerator
+
+
+CASE = {
+    "title": "Login works",
+    "description": "Valid credentials log the user in",
+    "steps": ["Open login page", "Log in"],
+    "expected_result": "Dashboard is shown",
+    "test_type": "e2e",
+    "priority": "high",
+    "preconditions": [],
+}
+
+
+class FakeCompletions:
+    """Returns the queued answers in order and counts the calls."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=self.answers.pop(0))
+        choice = SimpleNamespace(message=message, finish_reason="stop")
+        return SimpleNamespace(choices=[choice], usage=None)
+
+
+def make_generator(tmp_path, *answers):
+    generator = AITestCaseGenerator("sk-test", cache_dir=str(tmp_path))
+    completions = FakeCompletions(*answers)
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return generator, completions
+
+
+def test_complete_answer_is_cached(tmp_path):
+    answer = json.dumps({"test_cases": [CASE]})
+    generator, completions = make_generator(tmp_path, answer)
+
+    first = generator.generate_test_cases("story", num_cases=1)
+    second = generator.generate_test_cases("story", num_cases=1)
+
+    assert first == second
+    assert completions.calls == 1
+
+
+def test_empty_answer_is_not_cached(tmp_path):
+    generator, completions = make_generator(tmp_path, '{"test_cases": []}', "{}")
+
+    generator.generate_test_cases("story", num_cases=1)
+    generator.generate_test_cases("story", num_cases=1)
+
+    assert completions.calls == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_packed_answer_missing_a_story_is_not_cached(tmp_path):
+    answer = json.dumps({"results": {"0": {"test_cases": [CASE]}}})
+    generator, completions = make_generator(tmp_path, answer, answer)
+
+    results = generator.generate_test_cases_multi(["a", "b"], num_cases=1)
+    generator.generate_test_cases_multi(["a", "b"], num_cases=1)
+
+    assert isinstance(results[1], Exception)
+    assert completions.calls == 2
+
+
+def test_broken_cache_entry_is_ignored(tmp_path):
+    answer = json.dumps({"test_cases": [CASE]})
+    generator, completions = make_generator(tmp_path, answer, answer)
+    generator.generate_test_cases("story", num_cases=1)
+
+    # Simulate an entry truncated by an older version
+    [name] = os.listdir(tmp_path)
+    with open(tmp_path / name, "w", encoding="utf-8") as f:
+        f.write(answer[:-1])
+
+    test_cases = generator.generate_test_cases("story", num_cases=1)
+
+    assert [tc.title for tc in test_cases] == ["Login works"]
+    assert completions.calls == 2
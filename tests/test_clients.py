@@ -0,0 +1,81 @@
+"""
+Tests for how the generator opens and closes its OpenAI clients.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from test_case_generator import AITestCaseGenerator
+
+
+def test_async_client_is_created_on_first_use():
+    with AITestCaseGenerator("sk-test") as generator:
+        assert generator._async_client is None
+
+
+def test_generator_can_be_reused_after_aclose():
+    generator = AITestCaseGenerator("sk-test")
+
+    async def use_and_close():
+        client = generator.async_client
+        await generator.aclose()
+        return client
+
+    first = asyncio.run(use_and_close())
+    second = asyncio.run(use_and_close())
+
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
+    assert generator._async_client is None
+    generator.close()
+
+
+class FakeRateLimitError(openai.RateLimitError):
+    """A RateLimitError without the HTTP response a real one carries."""
+
+    def __init__(self, code=None):
+        Exception.__init__(self, "Rate limited")
+        self.code = code
+
+
+class FailingCompletions:
+    """Raises the given error for every request and counts the calls."""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def run_with_error(monkeypatch, error, max_attempts=3):
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    generator = AITestCaseGenerator("sk-test")
+    completions = FailingCompletions(error)
+    generator._async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with pytest.raises(Exception, match="Failed to generate test cases"):
+        asyncio.run(generator.agenerate_test_cases("As a user...", max_attempts=max_attempts))
+    return completions.calls
+
+
+def test_sdk_retries_are_turned_off():
+    generator = AITestCaseGenerator("sk-test")
+    assert generator.async_client.max_retries == 0
+    asyncio.run(generator.aclose())
+
+
+def test_rate_limits_are_retried(monkeypatch):
+    assert run_with_error(monkeypatch, FakeRateLimitError()) == 3
+
+
+def test_insufficient_quota_is_not_retried(monkeypatch):
+    assert run_with_error(monkeypatch, FakeRateLimitError("insufficient_quota")) == 1
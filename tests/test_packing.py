@@ -0,0 +1,109 @@
+"""
+Tests for sending several stories in one request.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from cli import _generate_all
+from test_case_generator import AITestCaseGenerator
+
+
+CASE = {
+    "title": "Login works",
+    "description": "Valid credentials log the user in",
+    "steps": ["Open login page", "Log in"],
+    "expected_result": "Dashboard is shown",
+    "test_type": "e2e",
+    "priority": "high",
+    "preconditions": [],
+}
+
+CUT_OFF = '{"results": {"0": {"test_cases": [{"title": "Log'
+SINGLE = json.dumps({"test_cases": [CASE]})
+
+
+def response(content, finish_reason):
+    choice = SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)
+    return SimpleNamespace(choices=[choice], usage=None)
+
+
+class FakeCompletions:
+    """Cuts off the packed answer, answers single stories in full."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def create(self, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        if '"results"' in prompt:
+            return response(CUT_OFF, "length")
+        return response(SINGLE, "stop")
+
+
+class AsyncFakeCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+
+def check_results(results, completions):
+    assert len(completions.prompts) == 3
+    assert [len(result) for result in results] == [1, 1]
+    assert results[0][0].title == "Login works"
+
+
+def test_cut_off_pack_is_sent_one_story_at_a_time():
+    generator = AITestCaseGenerator("sk-test")
+    completions = FakeCompletions()
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    results = generator.generate_test_cases_multi(["Story A", "Story B"], num_cases=1)
+
+    check_results(results, completions)
+
+
+def test_async_cut_off_pack_is_sent_one_story_at_a_time():
+    generator = AITestCaseGenerator("sk-test")
+    completions = AsyncFakeCompletions()
+    generator._async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    results = asyncio.run(generator.agenerate_test_cases_multi(["Story A", "Story B"], num_cases=1))
+
+    check_results(results, completions)
+
+
+class CountingCompletions(AsyncFakeCompletions):
+    """Also records the most requests that were ever in flight at once."""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return await super().create(**kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+def test_cut_off_packs_stay_within_concurrency():
+    generator = AITestCaseGenerator("sk-test")
+    completions = CountingCompletions()
+    generator._async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    results = {}
+
+    stories = [f"Story {i}" for i in range(10)]
+    asyncio.run(_generate_all(
+        generator, stories, 1, lambda index, story, result: results.update({index: result}),
+        concurrency=2, pack=5
+    ))
+
+    assert completions.peak == 2
+    assert sorted(results) == list(range(10))
+    assert all(len(result) == 1 for result in results.values())
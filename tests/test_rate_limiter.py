@@ -0,0 +1,32 @@
+"""
+Tests for the requests/tokens per minute limiter.
+"""
+
+import asyncio
+
+from test_case_generator import RateLimiter
+
+
+def acquire(rate_limiter, tokens):
+    asyncio.run(asyncio.wait_for(rate_limiter.acquire(tokens), timeout=1))
+
+
+def test_less_than_one_request_per_minute_still_sends_the_first():
+    rate_limiter = RateLimiter(max_requests_per_minute=0.5)
+
+    acquire(rate_limiter, 10)
+
+    assert rate_limiter._requests_available < 0.5
+
+
+def test_failed_request_gives_its_tokens_back():
+    rate_limiter = RateLimiter(max_tokens_per_minute=1000)
+
+    acquire(rate_limiter, 600)
+    rate_limiter.record_usage(600, 0)
+
+    assert rate_limiter._tokens_available >= 1000
+    # A request bigger than the bucket only ever takes the whole bucket
+    acquire(rate_limiter, 5000)
+    rate_limiter.record_usage(5000, 0)
+    assert rate_limiter._tokens_available <= 1001
@@ -0,0 +1,127 @@
+"""
+Tests for streaming test cases out of a chunked OpenAI response.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from test_case_generator import AITestCaseGenerator, ResponseTruncatedError, _iter_test_case_dicts
+
+
+CASE = {
+    "title": "Login works",
+    "description": "Valid credentials log the user in",
+    "steps": ["Open login page", "Enter {email} and password", "Click ]Login["],
+    "expected_result": "Dashboard is shown",
+    "test_type": "e2e",
+    "priority": "high",
+    "preconditions": ["User exists"],
+}
+ANSWER = json.dumps({"test_cases": [CASE, dict(CASE, title="Second")]}, indent=2)
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeStream:
+    """Mimics openai.Stream: iterable chunks plus close()/context manager."""
+
+    def __init__(self, text, size, finish_reason="stop"):
+        self.pieces = split(text, size)
+        self.finish_reason = finish_reason
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.read += 1
+            yield self.chunk(piece, None)
+        # Like OpenAI, say why the answer ended in a last chunk with no text
+        yield self.chunk(None, self.finish_reason)
+
+    @staticmethod
+    def chunk(content, finish_reason):
+        choice = SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)
+        return SimpleNamespace(choices=[choice])
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def make_generator(stream, tmp_path):
+    generator = AITestCaseGenerator("sk-test", cache_dir=str(tmp_path))
+    completions = SimpleNamespace(create=lambda **kwargs: stream)
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return generator
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 50, len(ANSWER)])
+def test_iter_test_case_dicts_handles_any_chunk_size(size):
+    items = list(_iter_test_case_dicts(split(ANSWER, size)))
+
+    assert [item["title"] for item in items] == ["Login works", "Second"]
+    assert items[0]["steps"] == CASE["steps"]
+
+
+def test_iter_test_case_dicts_without_test_cases_key():
+    assert list(_iter_test_case_dicts(split('{"tests": [{"title": "x"}]}', 4))) == []
+
+
+def test_stream_reads_whole_answer_and_closes_stream(tmp_path):
+    stream = FakeStream(ANSWER, 5)
+    generator = make_generator(stream, tmp_path)
+
+    titles = [tc.title for tc in generator.stream_test_cases("story", num_cases=2)]
+
+    assert titles == ["Login works", "Second"]
+    assert stream.read == len(stream.pieces)
+    assert stream.closed
+
+
+def test_stream_closed_when_caller_stops_early(tmp_path):
+    stream = FakeStream(ANSWER, 5)
+    generator = make_generator(stream, tmp_path)
+
+    test_cases = generator.stream_test_cases("story", num_cases=2)
+    next(test_cases)
+    test_cases.close()
+
+    assert stream.closed
+
+
+def test_streamed_answer_is_cached_whole(tmp_path):
+    stream = FakeStream(ANSWER, 5)
+    generator = make_generator(stream, tmp_path)
+    list(generator.stream_test_cases("story", num_cases=2))
+
+    # The fake stream is used up, so these can only come from the cache
+    titles = [tc.title for tc in generator.stream_test_cases("story", num_cases=2)]
+
+    assert titles == ["Login works", "Second"]
+    [name] = [p for p in tmp_path.iterdir()]
+    assert json.loads(name.read_text(encoding="utf-8")) == json.loads(ANSWER)
+
+
+def test_cut_off_stream_raises_after_complete_cases(tmp_path):
+    # Cut the answer off partway through the second test case
+    cut_off = ANSWER[:ANSWER.index('"Second"')]
+    stream = FakeStream(cut_off, 5, finish_reason="length")
+    generator = make_generator(stream, tmp_path)
+    received = []
+
+    with pytest.raises(ResponseTruncatedError):
+        for tc in generator.stream_test_cases("As a user..."):
+            received.append(tc)
+
+    assert [tc.title for tc in received] == ["Login works"]
+    assert stream.closed
+    assert not list(tmp_path.iterdir())
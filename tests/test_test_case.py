@@ -0,0 +1,70 @@
+"""
+Tests for the TestCase data structure.
+"""
+
+import copy
+import pickle
+from dataclasses import asdict
+
+import pytest
+
+import test_case_generator
+from test_case_generator import AITestCaseGenerator
+
+
+def make_test_case():
+    # Used through the module so pytest doesn't take TestCase for a test class
+    return test_case_generator.TestCase(
+        title="Login works",
+        description="Valid credentials log the user in",
+        steps=["Open login page", "Log in"],
+        expected_result="Dashboard is shown",
+        test_type="e2e",
+        priority="high",
+        preconditions=["User exists"],
+    )
+
+
+def test_has_no_instance_dict():
+    assert not hasattr(make_test_case(), "__dict__")
+
+
+def test_copy_and_pickle_round_trip():
+    tc = make_test_case()
+
+    assert copy.copy(tc) == tc
+    assert copy.deepcopy(tc) == tc
+    assert pickle.loads(pickle.dumps(tc)) == tc
+
+
+@pytest.mark.parametrize("field, value", [
+    ("steps", "Open login page, then log in"),
+    ("preconditions", "User exists"),
+    ("title", ["Login works"]),
+    ("priority", 1),
+])
+def test_fields_of_the_wrong_type_are_rejected(field, value):
+    generator = AITestCaseGenerator("sk-test")
+    case_data = {**asdict(make_test_case()), field: value}
+
+    assert generator._parse_test_case(case_data) is None
+    # The same check applies when the AI leaves some fields out
+    del case_data["description"]
+    assert generator._parse_test_case(case_data) is None
+
+
+def test_missing_fields_get_defaults():
+    generator = AITestCaseGenerator("sk-test")
+
+    tc = generator._parse_test_case({"title": "Login works"})
+
+    assert tc.steps == [] and tc.priority == "medium"
+
+
+def test_null_fields_get_defaults():
+    generator = AITestCaseGenerator("sk-test")
+    case_data = {**asdict(make_test_case()), "preconditions": None, "description": None}
+
+    tc = generator._parse_test_cases({"test_cases": [case_data]})[0]
+
+    assert tc.preconditions == [] and tc.description == ""